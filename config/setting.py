@@ -23,6 +23,8 @@ METADATA_WEIGHT = 0.3
 # Performance settings
 BATCH_SIZE = 32
 MAX_WORKERS = 4
+CHUNK_ROWS = 200_000  # Rows per chunk when loading datasets
+CSV_BLOCK_SIZE = 64 << 20  # Bytes per pyarrow CSV parse block
 
 # Amazon dataset configuration
 AMAZON_DATASET_PATH = RAW_DATA_DIR / "amazon_products.csv"
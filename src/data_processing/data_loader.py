@@ -1,10 +1,19 @@
 import pandas as pd
-from typing import Dict, List, Optional
-from pydantic import BaseModel, validator
+from typing import Dict, List, Optional, Tuple, Union
+from pydantic import BaseModel, TypeAdapter, ValidationError, validator
+import os
 import re
+import csv
+import hashlib
+import tempfile
 import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.parquet as pq
 from pathlib import Path
 
+from config.setting import CHUNK_ROWS, CSV_BLOCK_SIZE
+
 class ProductSchema(BaseModel):
     product_id: str
     title: str
@@ -42,6 +51,26 @@ class ProductSchema(BaseModel):
             return "unknown"
         return str(v).lower().strip()
 
+# Pydantic's lax-mode coercion, reused element-wise for columns without a native dtype
+_FLOAT_ADAPTER = TypeAdapter(float)
+_BOOL_ADAPTER = TypeAdapter(bool)
+
+def _is_str(series: pd.Series) -> pd.Series:
+    """Element-wise isinstance(value, str), the type check Pydantic applies to str fields"""
+    return series.astype(object).map(lambda v: isinstance(v, str)).astype(bool)
+
+def _lax_convert(series: pd.Series, adapter: TypeAdapter) -> Tuple[pd.Series, pd.Series]:
+    """Coerce values like a Pydantic field would; returns (values, passed mask)"""
+    values, passed = [], []
+    for value in series.astype(object):
+        try:
+            values.append(adapter.validate_python(value))
+            passed.append(True)
+        except ValidationError:
+            values.append(None)
+            passed.append(False)
+    return pd.Series(values, index=series.index, dtype=object), pd.Series(passed, index=series.index, dtype=bool)
+
 class DataLoader:
     def __init__(self):
         self.category_mapping = {
@@ -56,28 +85,141 @@ class DataLoader:
             'automotive': 'automotive/general',
             'health&wellness': 'health/wellness'
         }
+        
+        # Category levels are the runs of text between separators
+        self.category_level_pattern = re.compile(r'[^|,&\-\s]+')
+        self.price_symbol_pattern = re.compile(r'[₹$,£€]')
+        self.price_columns = ['price', 'discounted_price', 'actual_price', 'selling_price']
+        
+        # (fingerprint, validated dataframe) of the last validate_products call
+        self.validated_cache = (None, None)
     
-    def load_amazon_dataset(self, filepath: str) -> pd.DataFrame:
-        """Load and process Amazon product dataset"""
+    def load_amazon_dataset(self, filepath: str, chunk_rows: int = CHUNK_ROWS, use_cache: bool = True) -> pd.DataFrame:
+        """Load and process Amazon product dataset in chunks of raw rows"""
         print(f"📂 Loading dataset from: {filepath}")
         
+        # Reuse the normalized Parquet sidecar if it is newer than the source CSV
+        # and was written by the same loader code and settings
+        cache_path = Path(filepath).with_suffix('.normalized.parquet')
+        cache_key = self._normalization_key()
+        if use_cache and self._cache_is_fresh(cache_path, Path(filepath), cache_key):
+            try:
+                df_processed = pd.read_parquet(cache_path)
+                print(f"✅ Loaded cached dataset: {len(df_processed)} valid rows from {cache_path}")
+                return df_processed
+            except (pa.ArrowException, OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable cache {cache_path}: {e}")
+        
         try:
-            df = pd.read_csv(filepath)
-            print(f"✅ Dataset loaded: {len(df)} rows, {len(df.columns)} columns")
-            print(f"📊 Columns: {list(df.columns)}")
+            # Normalize each chunk's text fields as it is read, keeping only the
+            # columns the loader uses so the raw frame is never held in full
+            field_chunks = []
+            total_rows = 0
+            
+            for chunk in self._read_csv_chunks(filepath, chunk_rows):
+                if not field_chunks:
+                    print(f"📊 Columns: {list(chunk.columns)}")
+                total_rows += len(chunk)
+                field_chunks.append(self.normalize_fields(self.map_columns(chunk)))
             
-            # Process the dataframe
-            df_processed = self.process_amazon_data(df)
+            print(f"✅ Dataset loaded: {total_rows} rows")
+            
+            # Price column choice, missing-price fill and filtering use whole-file
+            # statistics, so the result does not depend on the chunk size
+            df_fields = pd.concat(field_chunks, copy=False)
+            df_processed = self.finalize_products(df_fields).reset_index(drop=True)
             print(f"✅ Dataset processed: {len(df_processed)} valid rows")
             
+            if use_cache:
+                self._write_cache(df_processed, cache_path, cache_key)
+            
             return df_processed
             
         except Exception as e:
             print(f"❌ Error loading dataset: {e}")
             raise
     
+    def _normalization_key(self) -> str:
+        """Hash of the loader source and settings that shape the normalized output"""
+        key = hashlib.sha1(Path(__file__).read_bytes())
+        key.update(repr((sorted(self.category_mapping.items()), self.price_columns)).encode())
+        return key.hexdigest()
+    
+    def _cache_is_fresh(self, cache_path: Path, source_path: Path, cache_key: str) -> bool:
+        """Check the sidecar's age and loader key without reading its data"""
+        if not cache_path.exists() or cache_path.stat().st_mtime < source_path.stat().st_mtime:
+            return False
+        try:
+            metadata = pq.read_schema(cache_path).metadata or {}
+        except (pa.ArrowException, OSError, ValueError):
+            return False  # Truncated or corrupt sidecar; rebuild it
+        return metadata.get(b'loader_key') == cache_key.encode()
+    
+    def _write_cache(self, df: pd.DataFrame, cache_path: Path, cache_key: str):
+        """Atomically write the normalized sidecar; a failed write only costs the cache"""
+        tmp_path = None
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**table.schema.metadata, b'loader_key': cache_key.encode()})
+            
+            # Write beside the target and rename, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.normalized.parquet')
+            os.close(fd)
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, cache_path)
+            print(f"💾 Cached normalized dataset to: {cache_path}")
+        except (pa.ArrowException, OSError) as e:
+            print(f"⚠️ Could not cache normalized dataset to {cache_path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def _read_csv_chunks(self, filepath: str, chunk_rows: int):
+        """Yield dataframes of about chunk_rows rows using pyarrow's multithreaded CSV reader"""
+        reader = pacsv.open_csv(
+            filepath,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types=self._csv_column_types(filepath),
+                strings_can_be_null=True  # Empty fields become NaN, as with pd.read_csv
+            )
+        )
+        
+        batches = []
+        batch_rows = 0
+        start_row = 0
+        
+        for batch in reader:
+            batches.append(batch)
+            batch_rows += batch.num_rows
+            
+            if batch_rows >= chunk_rows:
+                yield self._batches_to_frame(batches, start_row)
+                start_row += batch_rows
+                batches = []
+                batch_rows = 0
+        
+        if batches:
+            yield self._batches_to_frame(batches, start_row)
+    
+    def _csv_column_types(self, filepath: str) -> Dict[str, pa.DataType]:
+        """Read every column as string; type inference only sees the first block, and the loader parses fields itself"""
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            header = next(csv.reader(f), [])
+        return {name: pa.string() for name in header}
+    
+    def _batches_to_frame(self, batches: List[pa.RecordBatch], start_row: int) -> pd.DataFrame:
+        """Convert record batches to a dataframe indexed by row position in the file"""
+        df = pa.Table.from_batches(batches).to_pandas()
+        df.index = pd.RangeIndex(start_row, start_row + len(df))
+        return df
+    
     def process_amazon_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Process and normalize Amazon dataset"""
+        return self.normalize_dataframe(self.map_columns(df))
+    
+    def map_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rename Amazon dataset columns to our schema"""
         
         print(f"📋 Dataset columns: {list(df.columns)}")
         
@@ -100,26 +242,41 @@ class DataLoader:
         
         print(f"📋 After renaming: {list(df.columns)}")
         
-        # Clean and normalize the data
-        return self.normalize_dataframe(df)
+        return df
     
     def normalize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean and normalize the dataframe"""
+        return self.finalize_products(self.normalize_fields(df))
+    
+    def normalize_fields(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize the row-local fields; safe to run chunk by chunk"""
         print("🧹 Normalizing data...")
         
         # Generate product IDs if not present
         if 'product_id' not in df.columns:
             df['product_id'] = 'prod_' + df.index.astype(str)
         
-        # Handle missing values
-        df['title'] = df['title'].fillna('Unknown Product').astype(str)
-        df['description'] = df['description'].fillna('No description available').astype(str)
+        # Handle missing values and strip text fields once
+        df['title'] = df['title'].fillna('Unknown Product').astype(str).str.strip()
+        df['description'] = df['description'].fillna('No description available').astype(str).str.strip()
         
         # Extract/normalize brand
         df['brand'] = self.extract_brand(df)
         
         # Normalize category
-        df['category'] = df.apply(self.normalize_category, axis=1)
+        df['category'] = self.normalize_category(df)
+        
+        # Parse every candidate price column; the column is picked in finalize_products
+        price_cols = [col for col in self.price_columns if col in df.columns]
+        for col in price_cols:
+            df[col] = self.parse_prices(df[col])
+        
+        # Drop the unused raw columns (a new frame, not a view of the input)
+        keep = ['product_id', 'title', 'description', 'brand', 'category'] + price_cols
+        return df.drop(columns=df.columns.difference(keep))
+    
+    def finalize_products(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fill prices, filter invalid rows and select the final columns of the whole dataset"""
         
         # Extract/normalize price
         df['price'] = self.extract_price(df)
@@ -127,22 +284,20 @@ class DataLoader:
         # Set availability
         df['availability'] = True
         
-        # Clean text fields
-        df['title'] = df['title'].str.strip()
-        df['description'] = df['description'].str.strip()
-        
-        # Remove rows with invalid data
+        # Remove rows with invalid data (title/description are never null after fillna)
         initial_count = len(df)
-        df = df[df['title'].str.len() >= 5]  # Minimum title length
-        df = df[df['price'] > 0]  # Valid price
-        df = df.dropna(subset=['title', 'description'])
+        valid = (df['title'].str.len() >= 5) & (df['price'] > 0)  # Minimum title length, valid price
+        
+        # Select valid rows and final columns in one step
+        final_columns = ['product_id', 'title', 'description', 'brand', 'category', 'price', 'availability']
+        df = df.loc[valid, final_columns].copy()
         
         final_count = len(df)
         print(f"📊 Filtered: {initial_count} → {final_count} rows ({initial_count - final_count} removed)")
         
-        # Select final columns
-        final_columns = ['product_id', 'title', 'description', 'brand', 'category', 'price', 'availability']
-        df = df[final_columns].copy()
+        # Low-cardinality text columns are much smaller as categoricals
+        df['brand'] = df['brand'].astype('category')
+        df['category'] = df['category'].astype('category')
         
         return df
     
@@ -165,46 +320,45 @@ class DataLoader:
             else:
                 brands.append('unknown')
         
-        return pd.Series(brands)
+        return pd.Series(brands, index=df.index)
     
-    def normalize_category(self, row) -> str:
+    def normalize_category(self, df: pd.DataFrame) -> pd.Series:
         """Normalize category to hierarchical format"""
         # Try different category column names
         category_cols = ['category', 'main_category', 'product_category', 'subcategory']
         
-        category = None
+        category = pd.Series(np.nan, index=df.index, dtype=object)
         for col in category_cols:
-            if col in row.index and pd.notna(row[col]):
-                category = str(row[col]).strip().lower()
-                break
+            if col in df.columns:
+                category = category.fillna(df[col])
         
-        if not category:
-            return 'general/uncategorized'
+        category = category.where(category.isna(), category.astype(str))
+        category = category.str.strip().str.lower().fillna('')
         
-        # Apply category mapping
+        # Apply category mapping (first matching key wins)
+        normalized = pd.Series(np.nan, index=df.index, dtype=object)
         for key, value in self.category_mapping.items():
-            if key in category:
-                return value
+            matches = normalized.isna() & category.str.contains(key, regex=False)
+            normalized = normalized.mask(matches, value)
         
         # Create hierarchical format from category
-        parts = re.split(r'[|,&\-\s]+', category)
-        parts = [part.strip() for part in parts if part.strip()][:3]  # Max 3 levels
+        hierarchy = category.str.findall(self.category_level_pattern).str[:3].str.join('/')  # Max 3 levels
+        normalized = normalized.fillna(hierarchy)
         
-        return '/'.join(parts) if parts else 'general/uncategorized'
+        return normalized.replace('', 'general/uncategorized')
+    
+    def parse_prices(self, prices: pd.Series) -> pd.Series:
+        """Clean price strings (remove currency symbols, commas) in one pass"""
+        if prices.dtype == 'object':
+            prices = prices.astype(str).str.replace(self.price_symbol_pattern, '', regex=True)
+            prices = pd.to_numeric(prices, errors='coerce')
+        return prices
     
     def extract_price(self, df: pd.DataFrame) -> pd.Series:
         """Extract price from available columns"""
-        price_cols = ['price', 'discounted_price', 'actual_price', 'selling_price']
-        
-        for col in price_cols:
+        for col in self.price_columns:
             if col in df.columns:
-                prices = df[col].copy()
-                
-                # Clean price strings (remove currency symbols, commas)
-                if prices.dtype == 'object':
-                    prices = prices.astype(str).str.replace(r'[₹$,£€]', '', regex=True)
-                    prices = prices.str.replace(',', '')
-                    prices = pd.to_numeric(prices, errors='coerce')
+                prices = self.parse_prices(df[col])
                 
                 # Use this column if it has valid prices
                 valid_prices = prices[prices > 0]
@@ -214,24 +368,118 @@ class DataLoader:
         # If no price column found, generate random prices
         print("⚠️ No price column found, generating sample prices")
         np.random.seed(42)
-        return pd.Series(np.random.uniform(10, 1000, len(df)))
+        return pd.Series(np.random.uniform(10, 1000, len(df)), index=df.index)
     
-    def validate_products(self, df: pd.DataFrame) -> List[ProductSchema]:
-        """Validate products using Pydantic schema"""
+    def validate_products(self, df: pd.DataFrame, as_models: bool = True) -> Union[List[ProductSchema], pd.DataFrame]:
+        """Validate products with vectorized checks mirroring ProductSchema
+        
+        Returns ProductSchema models, or the validated dataframe when as_models is False.
+        """
         print("✅ Validating products...")
         
-        valid_products = []
+        # Skip re-validation when the same data was just validated by this loader
+        fingerprint = self._data_fingerprint(df)
+        if fingerprint is not None and self.validated_cache[0] == fingerprint:
+            validated = self.validated_cache[1]
+            print(f"✅ Validation cached: {len(validated)} valid")
+        else:
+            validated = self._validate_dataframe(df)
+            self.validated_cache = (fingerprint, validated)
+        
+        if not as_models:
+            return validated
+        
+        # Data is already validated, so skip per-row Pydantic validation
+        return [ProductSchema.model_construct(**record) for record in validated.to_dict('records')]
+    
+    def _validate_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Filter invalid rows and apply the ProductSchema transformations column-wise
+        
+        Accepts and rejects exactly the rows ProductSchema does: str fields must hold
+        strings (NaN is rejected), brand may also be None or absent, and price and
+        availability follow Pydantic's lax float/bool coercion.
+        """
+        missing = pd.Series(None, index=df.index, dtype=object)  # Stands in for absent required columns
+        
+        def column(name: str) -> pd.Series:
+            return df[name] if name in df.columns else missing
+        
+        title_is_str = _is_str(column('title'))
+        title = column('title').where(title_is_str, '').astype(str)
+        
+        brand = column('brand').astype(object) if 'brand' in df.columns else pd.Series('unknown', index=df.index, dtype=object)
+        
+        # Native float and bool columns need no per-value coercion
+        if pd.api.types.is_float_dtype(column('price')) or pd.api.types.is_integer_dtype(column('price')):
+            price, price_passed = column('price').astype(float), pd.Series(True, index=df.index)
+        else:
+            price, price_passed = _lax_convert(column('price'), _FLOAT_ADAPTER)
+            price = price.where(price_passed).astype(float)
+        
+        if 'availability' not in df.columns:
+            availability, availability_passed = pd.Series(True, index=df.index), pd.Series(True, index=df.index)
+        elif pd.api.types.is_bool_dtype(df['availability']):
+            availability, availability_passed = df['availability'], pd.Series(True, index=df.index)
+        else:
+            availability, availability_passed = _lax_convert(df['availability'], _BOOL_ADAPTER)
+        
+        # Column-wise equivalents of the ProductSchema field requirements
+        checks = {
+            'product_id must be a string': _is_str(column('product_id')),
+            'title must be a string': title_is_str,
+            'Title must be at least 5 characters': title.str.strip().str.len() >= 5,
+            'description must be a string': _is_str(column('description')),
+            'brand must be a string or missing': _is_str(brand) | brand.map(lambda v: v is None).astype(bool),
+            'category must be a string': _is_str(column('category')),
+            'price must be a number': price_passed,
+            'Price must be positive': ~(price <= 0),  # NaN passes, as in ProductSchema
+            'availability must be a boolean': availability_passed
+        }
+        
+        valid = pd.Series(True, index=df.index)
         errors = []
         
-        for idx, row in df.iterrows():
-            try:
-                product = ProductSchema(**row.to_dict())
-                valid_products.append(product)
-            except Exception as e:
-                errors.append(f"Row {idx}: {e}")
+        for message, passed in checks.items():
+            failed = valid & ~passed
+            errors.extend(f"Row {idx}: {message}" for idx in failed[failed].index)
+            valid &= passed
         
-        print(f"✅ Validation complete: {len(valid_products)} valid, {len(errors)} errors")
+        # Apply the ProductSchema validator transformations column-wise
+        description = column('description')[valid]
+        description = description.where(description != '', 'No description available')
+        brand = brand[valid]
+        brand = brand.where(brand.notna() & (brand != ''), 'unknown')
+        
+        validated = pd.DataFrame({
+            'product_id': column('product_id')[valid].astype(str),
+            'title': title[valid].str[:200].str.strip(),
+            'description': description.astype(str).str[:1000].str.strip(),
+            'brand': brand.astype(str).str.lower().str.strip(),
+            'category': column('category')[valid].astype(str),
+            'price': price[valid].round(2),
+            'availability': availability[valid].astype(bool)
+        })
+        
+        print(f"✅ Validation complete: {len(validated)} valid, {len(errors)} errors")
         if errors[:5]:  # Show first 5 errors
             print("⚠️ Sample errors:", errors[:5])
         
-        return valid_products
\ No newline at end of file
+        return validated
+    
+    def _data_fingerprint(self, df: pd.DataFrame) -> Optional[str]:
+        """Fingerprint of the index and every value of the ProductSchema columns, so edits and copies miss the cache
+        
+        Other columns are ignored, as validation ignores them. Returns None when a schema
+        column holds unhashable values (e.g. lists); such frames are validated uncached.
+        """
+        columns = [col for col in ProductSchema.model_fields if col in df.columns]
+        fingerprint = hashlib.sha1(repr((columns, [str(df[col].dtype) for col in columns])).encode())
+        
+        try:
+            fingerprint.update(pd.util.hash_pandas_object(df.index).values.tobytes())
+            for col in columns:
+                fingerprint.update(pd.util.hash_pandas_object(df[col], index=False).values.tobytes())
+        except TypeError:
+            return None
+        
+        return fingerprint.hexdigest()
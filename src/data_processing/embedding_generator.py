@@ -1,58 +1,243 @@
 from sentence_transformers import SentenceTransformer
+import torch
 import numpy as np
-from typing import List, Dict, Optional
+import pyarrow as pa
+from typing import List, Dict, Optional, Tuple
 import pandas as pd
 import chromadb
 from chromadb.config import Settings
 import os
 from pathlib import Path
 import time
+import hashlib
+import functools
+import queue
+import threading
+
+# Optional JIT for normalizing very large embedding batches
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_MIN_ROWS = 50_000
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _normalize_rows(embeddings):
+        for i in numba.prange(embeddings.shape[0]):
+            sq_norm = 0.0
+            for j in range(embeddings.shape[1]):
+                sq_norm += embeddings[i, j] * embeddings[i, j]
+            inv_norm = 1.0 / max(np.sqrt(sq_norm), 1e-12)
+            for j in range(embeddings.shape[1]):
+                embeddings[i, j] *= inv_norm
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize embedding rows in place"""
+    if numba is not None and len(embeddings) >= NUMBA_MIN_ROWS:
+        _normalize_rows(embeddings)
+        return embeddings
+    
+    # Row norms via einsum avoid materializing the squared matrix
+    sq_norms = np.einsum('ij,ij->i', embeddings, embeddings)
+    embeddings *= np.reciprocal(np.sqrt(np.maximum(sq_norms, 1e-24)))[:, None]
+    return embeddings
+
+class OnnxEncoder:
+    """INT8-quantized ONNX Runtime encoder exposing the SentenceTransformer encode API"""
+    
+    def __init__(self, model_name: str, cache_directory: str, max_seq_length: int = 256):
+        # Optional dependencies, only needed for the ONNX backend
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        self.max_seq_length = max_seq_length
+        model_dir = Path(cache_directory) / "onnx" / model_name.replace("/", "__")
+        quantized_file = "model_quantized.onnx"
+        
+        # Export and quantize once; later runs load the cached model
+        if not (model_dir / quantized_file).exists():
+            print(f"⚙️ Exporting {model_name} to ONNX with INT8 dynamic quantization")
+            model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+            quantizer = ORTQuantizer.from_pretrained(model)
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=quantized_file,
+            provider="CPUExecutionProvider"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+    
+    def encode(self,
+               sentences: List[str],
+               batch_size: int = 32,
+               normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True,
+               show_progress_bar: bool = False,
+               convert_to_tensor: bool = False,
+               device: Optional[str] = None,
+               **kwargs):
+        """Mean-pooled sentence embeddings, batched over length-sorted inputs
+        
+        Accepts the SentenceTransformer.encode options that apply to a CPU ONNX model;
+        any other option raises instead of being silently ignored.
+        """
+        if kwargs:
+            raise TypeError(f"OnnxEncoder.encode does not support: {', '.join(sorted(kwargs))}")
+        if device not in (None, "cpu"):
+            raise ValueError(f"OnnxEncoder runs on the CPU execution provider, not device={device!r}")
+        
+        # Sort by length so each batch pads to a similar sequence length
+        order = np.argsort([-len(sentence) for sentence in sentences], kind="stable")
+        embeddings = np.zeros((len(sentences), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        for i in range(0, len(sentences), batch_size):
+            batch_idx = order[i:i + batch_size]
+            inputs = self.tokenizer(
+                [sentences[j] for j in batch_idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+            
+            # Mean pooling over non-padding tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            embeddings[batch_idx] = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        
+        if normalize_embeddings:
+            _normalize(embeddings)
+        
+        if convert_to_tensor:
+            return torch.from_numpy(embeddings)
+        
+        return embeddings
+
+class FaissCollection:
+    """In-memory exact inner-product index exposing the ChromaDB collection calls used here"""
+    
+    def __init__(self, name: str, embedding_dim: int):
+        # Optional dependency, only needed for the FAISS vector store
+        import faiss
+        
+        self.name = name
+        self.index = faiss.IndexFlatIP(embedding_dim)
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+    
+    def add(self, embeddings, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        self.index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+    
+    def count(self) -> int:
+        return self.index.ntotal
+    
+    def query(self, query_embeddings, n_results: int = 10, include: Optional[List[str]] = None) -> Dict:
+        """Search all queries in one call; distances are cosine distances like ChromaDB's"""
+        scores, positions = self.index.search(np.ascontiguousarray(query_embeddings, dtype=np.float32), n_results)
+        
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for row_scores, row_positions in zip(scores, positions):
+            hits = [(score, pos) for score, pos in zip(row_scores, row_positions) if pos != -1]
+            results['ids'].append([self.ids[pos] for _, pos in hits])
+            results['documents'].append([self.documents[pos] for _, pos in hits])
+            results['metadatas'].append([self.metadatas[pos] for _, pos in hits])
+            results['distances'].append([1.0 - float(score) for score, _ in hits])
+        
+        return results
 
 class EmbeddingGenerator:
     def __init__(self, 
                  model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
-                 persist_directory: str = "./data/embeddings"):
-        
-        print(f"🤖 Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+                 persist_directory: str = "./data/embeddings",
+                 backend: str = "torch",
+                 fp16: bool = True,
+                 vector_store: str = "chroma",
+                 compile_model: bool = False):
+        
+        print(f"🤖 Loading embedding model: {model_name} ({backend} backend)")
+        self.model_name = model_name
+        self.backend = backend
+        if backend == "torch":
+            self.model = SentenceTransformer(model_name)
+            
+            # Half precision halves GPU memory and uses tensor cores; CPU stays FP32
+            self.precision = "fp32"
+            if fp16 and torch.cuda.is_available():
+                self.model = self.model.to('cuda').half()
+                self.precision = "fp16"
+                print("⚡ Using FP16 inference on GPU")
+            
+            self.model.eval()
+            
+            # Opt-in kernel fusion (PyTorch 2.x, GPU only); dynamic shapes avoid a
+            # recompile for every padded batch length
+            if compile_model and hasattr(torch, 'compile') and torch.cuda.is_available():
+                self.model[0].auto_model = torch.compile(self.model[0].auto_model, dynamic=True)
+                print("⚡ Compiled transformer with torch.compile")
+        elif backend == "onnx":
+            self.model = OnnxEncoder(model_name, persist_directory)
+            self.precision = "int8"
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         
         print(f"📐 Embedding dimension: {self.embedding_dim}")
         
-        # Initialize ChromaDB
+        # Per-instance LRU cache so repeated queries skip the model forward pass
+        self.encode_query = functools.lru_cache(maxsize=256)(self._encode_query)
+        
         self.persist_directory = persist_directory
         os.makedirs(persist_directory, exist_ok=True)
         
-        print(f"🗄️ Initializing ChromaDB at: {persist_directory}")
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        # Initialize ChromaDB, or keep vectors in an in-memory FAISS index
+        self.vector_store = vector_store
+        if vector_store == "chroma":
+            print(f"🗄️ Initializing ChromaDB at: {persist_directory}")
+            self.client = chromadb.PersistentClient(path=persist_directory)
+        elif vector_store == "faiss":
+            print("🗄️ Using in-memory FAISS flat index")
+            self.client = None
+        else:
+            raise ValueError(f"Unknown vector store: {vector_store}")
         
     def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
         """Generate embeddings for text chunks in batches"""
-        print(f"🔄 Generating embeddings for {len(texts)} texts...")
-        
-        embeddings = []
         total_batches = (len(texts) + batch_size - 1) // batch_size
-        
-        for i in range(0, len(texts), batch_size):
-            batch_num = (i // batch_size) + 1
-            batch = texts[i:i + batch_size]
-            
-            print(f"   Processing batch {batch_num}/{total_batches} ({len(batch)} texts)")
-            
-            # Generate embeddings for batch
-            batch_embeddings = self.model.encode(
-                batch,
-                normalize_embeddings=True,
-                show_progress_bar=False
-            )
-            embeddings.extend(batch_embeddings)
+        print(f"🔄 Generating embeddings for {len(texts)} texts ({total_batches} batches)...")
+        
+        # SentenceTransformer batches internally and returns a single ndarray
+        embeddings = self._encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=True
+        )
         
         print(f"✅ Generated {len(embeddings)} embeddings")
-        return np.array(embeddings)
+        return embeddings
     
     def create_collection(self, collection_name: str = "product_embeddings") -> chromadb.Collection:
         """Create or get ChromaDB collection"""
         
+        if self.vector_store == "faiss":
+            print(f"✅ Created FAISS index: {collection_name}")
+            return FaissCollection(collection_name, self.embedding_dim)
+        
         # Delete existing collection if exists (for fresh start)
         try:
             existing_collection = self.client.get_collection(collection_name)
@@ -74,6 +259,26 @@ class EmbeddingGenerator:
         print(f"✅ Created collection: {collection_name}")
         return collection
     
+    def prepare_records(self, chunks_df: pd.DataFrame) -> Tuple[List[str], List[str], List[Dict]]:
+        """Prepare ids, documents and metadata for ChromaDB"""
+        ids = chunks_df['chunk_id'].tolist()
+        documents = chunks_df['text'].tolist()
+        
+        # Prepare metadata (ChromaDB requires string values) as one Arrow table,
+        # materialized to Python dicts in a single C-level pass
+        metadatas = pa.table({
+            'product_id': chunks_df['product_id'].astype(str),
+            'chunk_index': chunks_df['chunk_index'].astype(str),
+            'word_count': chunks_df['word_count'].astype(str),
+            'brand': chunks_df['brand'].astype(str),
+            'category': chunks_df['category'].astype(str),
+            'price': chunks_df['price'].astype(str),
+            'availability': chunks_df['availability'].astype(str),
+            'title': chunks_df['original_title'].astype(str).str[:100]  # Truncate for storage
+        }).to_pylist()
+        
+        return ids, documents, metadatas
+    
     def store_embeddings(self, 
                         chunks_df: pd.DataFrame, 
                         embeddings: np.ndarray,
@@ -86,26 +291,10 @@ class EmbeddingGenerator:
         collection = self.create_collection(collection_name)
         
         # Prepare data for ChromaDB
-        ids = chunks_df['chunk_id'].tolist()
-        documents = chunks_df['text'].tolist()
+        ids, documents, metadatas = self.prepare_records(chunks_df)
         
-        # Prepare metadata (ChromaDB requires string values)
-        metadatas = []
-        for idx, row in chunks_df.iterrows():
-            metadata = {
-                'product_id': str(row['product_id']),
-                'chunk_index': str(row['chunk_index']),
-                'word_count': str(row['word_count']),
-                'brand': str(row['brand']),
-                'category': str(row['category']),
-                'price': str(row['price']),
-                'availability': str(row['availability']),
-                'title': str(row['original_title'][:100])  # Truncate for storage
-            }
-            metadatas.append(metadata)
-        
-        # Store in batches
-        batch_size = 100
+        # Store in as few bulk adds as ChromaDB's batch limit allows
+        batch_size = self.client.max_batch_size if self.client is not None else max(len(ids), 1)
         total_batches = (len(ids) + batch_size - 1) // batch_size
         
         for i in range(0, len(ids), batch_size):
@@ -124,29 +313,121 @@ class EmbeddingGenerator:
         print(f"✅ Stored all embeddings in collection: {collection_name}")
         return collection
     
-    def process_chunks_to_embeddings(self, chunks_df: pd.DataFrame) -> chromadb.Collection:
-        """Complete pipeline: chunks -> embeddings -> storage"""
+    def process_chunks_to_embeddings(self,
+                                     chunks_df: pd.DataFrame,
+                                     collection_name: str = "product_embeddings",
+                                     block_size: int = 500,
+                                     batch_size: int = 32,
+                                     cache_embeddings: bool = False,
+                                     **encode_kwargs) -> chromadb.Collection:
+        """Complete pipeline: chunks -> embeddings -> storage, overlapping encode and storage
+        
+        With cache_embeddings, vectors are saved as FP16 .npy files and later runs on the
+        same chunks memory-map them instead of encoding. Extra keyword arguments are
+        passed through to model.encode.
+        """
         
         print(f"🚀 Starting embedding pipeline for {len(chunks_df)} chunks")
         print("="*60)
         
-        # Extract texts
-        texts = chunks_df['text'].tolist()
-        
-        # Generate embeddings
-        start_time = time.time()
-        embeddings = self.generate_embeddings(texts)
-        embedding_time = time.time() - start_time
+        collection = self.create_collection(collection_name)
         
-        print(f"⏱️ Embedding generation took: {embedding_time:.2f} seconds")
-        print(f"📊 Average time per text: {embedding_time/len(texts)*1000:.2f} ms")
+        # Order chunks by text length so every encode block pads to similar lengths;
+        # records are stored by id, so the order does not matter to ChromaDB
+        chunks_df = chunks_df.iloc[chunks_df['text'].str.len().argsort(kind='stable').values]
         
-        # Store in ChromaDB
+        # Extract texts and storage records
+        texts = chunks_df['text'].tolist()
+        ids, documents, metadatas = self.prepare_records(chunks_df)
+        
+        encode_options = {
+            'batch_size': batch_size,
+            'normalize_embeddings': True,
+            'convert_to_numpy': True,
+            'show_progress_bar': False,
+            **encode_kwargs
+        }
+        
+        # Reuse vectors from an earlier run on the same texts, model variant and options
+        cache_dir = Path(self.persist_directory) / "cache" / f"{self.model_name.replace('/', '__')}__{self.backend}-{self.precision}"
+        cache_key = self._embedding_cache_key(texts, encode_options) if cache_embeddings else None
+        cached_embeddings = self._load_cached_embeddings(cache_dir, ids, cache_key) if cache_embeddings else None
+        encoded_blocks = []
+        
+        # Bounded queue so at most a few encoded blocks wait for storage
+        storage_queue = queue.Queue(maxsize=4)
+        storage_errors = []
+        
+        def storage_worker():
+            while True:
+                block = storage_queue.get()
+                if block is None:
+                    break
+                start, end, embeddings = block
+                
+                # Keep draining after a failure so the producer never blocks
+                if storage_errors:
+                    continue
+                try:
+                    collection.add(
+                        embeddings=embeddings.tolist(),
+                        documents=documents[start:end],
+                        metadatas=metadatas[start:end],
+                        ids=ids[start:end]
+                    )
+                except Exception as e:
+                    storage_errors.append(e)
+        
+        storage_thread = threading.Thread(target=storage_worker, daemon=True)
+        storage_thread.start()
+        
+        # Each block is one collection.add, so it must fit ChromaDB's batch limit
+        if self.client is not None:
+            block_size = min(block_size, self.client.max_batch_size)
+        
+        # Encode block by block while the worker stores the previous blocks
         start_time = time.time()
-        collection = self.store_embeddings(chunks_df, embeddings)
-        storage_time = time.time() - start_time
+        embedding_time = 0.0
+        total_blocks = (len(texts) + block_size - 1) // block_size
         
-        print(f"⏱️ Storage took: {storage_time:.2f} seconds")
+        try:
+            for i in range(0, len(texts), block_size):
+                # Stop encoding once storage has failed; the error is raised below
+                if storage_errors:
+                    break
+                
+                block_num = (i // block_size) + 1
+                end_idx = min(i + block_size, len(texts))
+                
+                if cached_embeddings is not None:
+                    # Widen only this block; the rest stays memory-mapped
+                    embeddings = cached_embeddings[i:end_idx].astype(np.float32)
+                else:
+                    print(f"   Encoding block {block_num}/{total_blocks}")
+                    
+                    encode_start = time.time()
+                    embeddings = self._encode(texts[i:end_idx], **encode_options)
+                    embedding_time += time.time() - encode_start
+                    
+                    if cache_embeddings:
+                        encoded_blocks.append(embeddings)
+                
+                storage_queue.put((i, end_idx, embeddings))
+        finally:
+            storage_queue.put(None)
+            storage_thread.join()
+        
+        if storage_errors:
+            raise storage_errors[0]
+        
+        if encoded_blocks:
+            self._save_cached_embeddings(cache_dir, ids, cache_key, np.concatenate(encoded_blocks))
+        
+        total_time = time.time() - start_time
+        
+        print(f"⏱️ Embedding generation took: {embedding_time:.2f} seconds")
+        print(f"📊 Average time per text: {embedding_time/max(len(texts), 1)*1000:.2f} ms")
+        print(f"⏱️ Embedding + storage took: {total_time:.2f} seconds (overlapped)")
         
         # Verify storage
         stored_count = collection.count()
@@ -154,34 +435,110 @@ class EmbeddingGenerator:
         
         return collection
     
+    def _embedding_cache_key(self, texts: List[str], encode_options: Dict) -> str:
+        """Hash of the model variant, output-affecting encode options and every chunk text"""
+        options = {k: v for k, v in encode_options.items() if k not in ('batch_size', 'show_progress_bar')}
+        key = hashlib.sha1(repr((self.model_name, self.backend, self.precision, sorted(options.items()))).encode())
+        for text in texts:
+            key.update(text.encode())
+            key.update(b'\0')
+        return key.hexdigest()
+    
+    def _load_cached_embeddings(self, cache_dir: Path, ids: List[str], cache_key: str) -> Optional[np.ndarray]:
+        """Memory-map cached FP16 embeddings if they were saved for exactly these chunks and texts"""
+        embeddings_path = cache_dir / "chunks_fp16.npy"
+        ids_path = cache_dir / "chunks_ids.npy"
+        key_path = cache_dir / "chunks_key.txt"
+        
+        if not (embeddings_path.exists() and ids_path.exists() and key_path.exists()):
+            return None
+        
+        embeddings = np.load(embeddings_path, mmap_mode='r')
+        if (key_path.read_text() != cache_key
+                or embeddings.shape != (len(ids), self.embedding_dim)
+                or not np.array_equal(np.load(ids_path), np.asarray(ids))):
+            print("⚠️ Cached embeddings do not match these chunks, re-encoding")
+            return None
+        
+        print(f"📦 Loaded {len(embeddings)} cached embeddings from: {embeddings_path}")
+        return embeddings
+    
+    def _save_cached_embeddings(self, cache_dir: Path, ids: List[str], cache_key: str, embeddings: np.ndarray):
+        """Save embeddings as FP16 (half the bytes of FP32) together with their chunk ids and cache key"""
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(cache_dir / "chunks_fp16.npy", embeddings.astype(np.float16))
+        np.save(cache_dir / "chunks_ids.npy", np.asarray(ids))
+        (cache_dir / "chunks_key.txt").write_text(cache_key)
+        print(f"💾 Cached {len(embeddings)} FP16 embeddings in: {cache_dir}")
+    
+    def _encode(self, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """Run model.encode without autograd bookkeeping"""
+        with torch.inference_mode():
+            return self.model.encode(texts, **encode_kwargs)
+    
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Embed a single query; wrapped by the encode_query LRU cache"""
+        return self._encode([query], normalize_embeddings=True, show_progress_bar=False)[0]
+    
     def test_similarity_search(self, collection: chromadb.Collection, query: str, n_results: int = 5):
         """Test similarity search with a sample query"""
         
         print(f"\n🔍 Testing similarity search with query: '{query}'")
         print("-" * 50)
         
-        # Generate query embedding
-        query_embedding = self.model.encode([query], normalize_embeddings=True)
+        # Generate query embedding (cached per query text)
+        query_embedding = self.encode_query(query)
         
         # Search similar chunks
         results = collection.query(
-            query_embeddings=query_embedding.tolist(),
+            query_embeddings=[query_embedding.tolist()],
             n_results=n_results,
             include=['documents', 'metadatas', 'distances']
         )
         
+        self._print_results(results['documents'][0], results['metadatas'][0], results['distances'][0], n_results)
+        
+        return results
+    
+    def batch_similarity_search(self, collection: chromadb.Collection, queries: List[str], n_results: int = 5):
+        """Search several queries with one encode call and one collection query"""
+        
+        print(f"\n🔍 Testing similarity search with {len(queries)} queries in one batch")
+        
+        query_embeddings = self._encode(
+            queries,
+            batch_size=len(queries),
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        
+        results = collection.query(
+            query_embeddings=query_embeddings.tolist(),
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+        
+        for query, documents, metadatas, distances in zip(
+            queries,
+            results['documents'],
+            results['metadatas'],
+            results['distances']
+        ):
+            print(f"\n🔍 Query: '{query}'")
+            print("-" * 50)
+            self._print_results(documents, metadatas, distances, n_results)
+        
+        return results
+    
+    def _print_results(self, documents: List[str], metadatas: List[Dict], distances: List[float], n_results: int):
+        """Print the hits of a single query"""
         print(f"📋 Top {n_results} similar chunks:")
         
-        for i, (doc, metadata, distance) in enumerate(zip(
-            results['documents'][0], 
-            results['metadatas'][0], 
-            results['distances'][0]
-        )):
+        for i, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
             similarity = 1 - distance  # Convert distance to similarity
             print(f"\n{i+1}. Similarity: {similarity:.3f}")
             print(f"   Product: {metadata['title']}")
             print(f"   Brand: {metadata['brand']}")
             print(f"   Price: ₹{metadata['price']}")
             print(f"   Text: {doc[:100]}...")
-        
-        return results
\ No newline at end of file
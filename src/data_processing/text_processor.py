@@ -1,7 +1,9 @@
 import nltk
+import os
 from typing import List, Dict, Tuple
 import re
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
 
 # Download required NLTK data
 try:
@@ -9,11 +11,35 @@ try:
 except LookupError:
     nltk.download('punkt', quiet=True)
 
+# blingfire's finite-state sentence splitter is much faster than NLTK Punkt
+try:
+    import blingfire
+except ImportError:
+    blingfire = None
+
+# Precompiled patterns used on every chunk
+_WS_RE = re.compile(r'\s+')
+_DOTS_RE = re.compile(r'\.{2,}')
+_SENT_RE = re.compile(r'[.!?]+')
+
+# Single-character formatting fixes applied in one str.translate pass
+_PUNCT_TABLE = str.maketrans({'|': '. ', '\n': '. ', '\t': ' '})
+
+# Category separators rewritten in one str.translate pass, no regex callbacks
+_CAT_TABLE = str.maketrans({'&': ' and ', '|': ' > '})
+
 class TextProcessor:
-    def __init__(self, target_chunk_size: int = 125, overlap_size: int = 25):
+    def __init__(self, target_chunk_size: int = 125, overlap_size: int = 25, n_jobs: int = 1):
         self.target_chunk_size = target_chunk_size
         self.overlap_size = overlap_size
         self.min_chunk_size = 50
+        self.use_blingfire = blingfire is not None
+        
+        # Worker processes are opt-in (n_jobs > 1 or -1) and only used when the dataframe
+        # is large enough: chunking costs ~0.25 ms per product, while starting loky
+        # workers costs seconds
+        self.n_jobs = n_jobs
+        self.parallel_min_products = 50_000
     
     def concatenate_product_text(self, product_row: Dict) -> str:
         """Concatenate title, brand, category, and description for better embeddings"""
@@ -37,7 +63,7 @@ class TextProcessor:
         
         if category:
             # Clean category (remove special characters)
-            clean_category = category.replace('&', ' and ').replace('|', ' > ')
+            clean_category = category.translate(_CAT_TABLE)
             concatenated_parts.append(f"Category: {clean_category}")
         
         # Price context
@@ -69,52 +95,48 @@ class TextProcessor:
         text = self._clean_text(text)
         
         # Sentence tokenization
-        try:
-            sentences = nltk.sent_tokenize(text)
-        except:
-            # Fallback if NLTK fails
-            sentences = self._simple_sentence_split(text)
+        sentences = self._split_sentences(text)
+        
+        # Tokenize once into words, remembering where each sentence ends
+        words = []
+        sentence_ends = []
+        for sentence in sentences:
+            sentence_words = sentence.split()
+            if sentence_words:
+                words.extend(sentence_words)
+                sentence_ends.append(len(words))
         
         chunks = []
-        current_chunk = ""
-        current_word_count = 0
         chunk_index = 0
+        start = 0  # Current chunk covers words[start:end]
+        end = 0
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            sentence_words = len(sentence.split())
-            
+        for sentence_end in sentence_ends:
             # Check if adding this sentence exceeds target size
-            if current_word_count + sentence_words > self.target_chunk_size and current_chunk:
+            if sentence_end - start > self.target_chunk_size and end > start:
                 # Save current chunk
                 chunks.append({
-                    'text': current_chunk.strip(),
+                    'text': " ".join(words[start:end]),
                     'chunk_id': f"{product_id}_chunk_{chunk_index}",
                     'chunk_index': chunk_index,
-                    'word_count': current_word_count,
+                    'word_count': end - start,
                     'product_id': product_id
                 })
                 
-                # Start new chunk with overlap
-                overlap_text = self._get_overlap(current_chunk)
-                current_chunk = overlap_text + " " + sentence if overlap_text else sentence
-                current_word_count = len(current_chunk.split())
+                # Start new chunk with overlap of the last N words
+                start = end - self.overlap_size if end - start > self.overlap_size else end
                 chunk_index += 1
-            else:
-                # Add sentence to current chunk
-                current_chunk += " " + sentence if current_chunk else sentence
-                current_word_count += sentence_words
+            
+            # Add sentence to current chunk
+            end = sentence_end
         
         # Add final chunk if it meets minimum size
-        if current_chunk and current_word_count >= 30:  # Relaxed minimum for final chunk
+        if end - start >= 30:  # Relaxed minimum for final chunk
             chunks.append({
-                'text': current_chunk.strip(),
+                'text': " ".join(words[start:end]),
                 'chunk_id': f"{product_id}_chunk_{chunk_index}",
                 'chunk_index': chunk_index,
-                'word_count': current_word_count,
+                'word_count': end - start,
                 'product_id': product_id
             })
         
@@ -136,59 +158,110 @@ class TextProcessor:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         
         # Fix common formatting issues
-        text = text.replace('|', '. ')
-        text = text.replace('\n', '. ')
-        text = text.replace('\t', ' ')
+        text = text.translate(_PUNCT_TABLE)
         
         # Remove extra periods
-        text = re.sub(r'\.{2,}', '.', text)
+        text = _DOTS_RE.sub('.', text)
         
         return text.strip()
     
+    def _split_sentences(self, text: str) -> List[str]:
+        """Split text into sentences with blingfire, falling back to NLTK"""
+        if self.use_blingfire:
+            return blingfire.text_to_sentences(text).split('\n')
+        
+        try:
+            return nltk.sent_tokenize(text)
+        except:
+            # Fallback if NLTK fails
+            return self._simple_sentence_split(text)
+    
     def _simple_sentence_split(self, text: str) -> List[str]:
         """Fallback sentence splitting if NLTK fails"""
         # Split on periods, exclamation marks, question marks
-        sentences = re.split(r'[.!?]+', text)
+        sentences = _SENT_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
-    def _get_overlap(self, text: str) -> str:
-        """Get last N words for overlap between chunks"""
-        if not text:
-            return ""
+    def concatenate_dataframe_text(self, df: pd.DataFrame) -> pd.Series:
+        """Vectorized concatenate_product_text over every row of a dataframe"""
         
-        words = text.split()
-        if len(words) > self.overlap_size:
-            return " ".join(words[-self.overlap_size:])
-        return ""
-    
-    def process_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Process entire dataframe to create chunks"""
-        print("🔄 Processing products for text chunking...")
+        title = df['title'].astype(str).str.strip()
+        brand = df['brand'].astype(str).str.strip()
+        category = df['category'].astype(str).str.strip()
+        description = df['description'].astype(str).str.strip()
+        price = df['price']
         
+        clean_category = category.str.translate(_CAT_TABLE)
+        
+        # Each part is NaN where the row-wise version would skip it
+        parts = [
+            ("Product: " + title).where(title != ''),
+            ("Brand: " + brand).where((brand != '') & (brand.str.lower() != 'unknown')),
+            ("Category: " + clean_category).where(category != ''),
+            ("Price: ₹" + price.astype(str)).where(price > 0),
+            ("Description: " + description).where(description != '')
+        ]
+        
+        # Prefix every present part with the separator, then drop the leading one
+        concatenated = pd.Series('', index=df.index)
+        for part in parts:
+            concatenated += ('. ' + part).fillna('')
+        
+        return concatenated.str[2:]
+    
+    def _chunk_records(self, records: List[Tuple]) -> List[Dict]:
+        """Chunk (text, product_id, title, brand, category, price, availability) records"""
         all_chunks = []
         
-        for idx, row in df.iterrows():
-            # Concatenate text
-            concatenated_text = self.concatenate_product_text(row.to_dict())
-            
+        for concatenated_text, product_id, title, brand, category, price, availability in records:
             # Create chunks
-            chunks = self.chunk_text(concatenated_text, row['product_id'])
+            chunks = self.chunk_text(concatenated_text, product_id)
             
             # Add metadata to each chunk
             for chunk in chunks:
                 chunk_data = {
                     **chunk,  # chunk info
-                    'original_title': row['title'],
-                    'brand': row['brand'],
-                    'category': row['category'],
-                    'price': row['price'],
-                    'availability': row['availability']
+                    'original_title': title,
+                    'brand': brand,
+                    'category': category,
+                    'price': price,
+                    'availability': availability
                 }
                 all_chunks.append(chunk_data)
         
+        return all_chunks
+    
+    def process_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Process entire dataframe to create chunks"""
+        print("🔄 Processing products for text chunking...")
+        
+        # Concatenate text for all products in one columnar pass
+        concatenated_texts = self.concatenate_dataframe_text(df)
+        
+        records = list(zip(
+            concatenated_texts, df['product_id'], df['title'], df['brand'],
+            df['category'], df['price'], df['availability']
+        ))
+        
+        # Resolve joblib conventions such as n_jobs=-1 (all cores), never exceeding the core count
+        n_jobs = min(effective_n_jobs(self.n_jobs), os.cpu_count() or 1)
+        
+        if n_jobs > 1 and len(records) >= self.parallel_min_products:
+            # Split products into a few batches per worker to balance the load
+            batch_size = -(-len(records) // (n_jobs * 4))
+            batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+            
+            print(f"   Chunking {len(batches)} batches across {n_jobs} workers")
+            results = Parallel(n_jobs=n_jobs, backend='loky')(
+                delayed(self._chunk_records)(batch) for batch in batches
+            )
+            all_chunks = [chunk for result in results for chunk in result]
+        else:
+            all_chunks = self._chunk_records(records)
+        
         print(f"✅ Created {len(all_chunks)} chunks from {len(df)} products")
         
         # Convert to DataFrame
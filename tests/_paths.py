@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+# Repository root and data folders shared by the tests
+BASE = Path(__file__).resolve().parents[1]
+RAW = BASE / "data/raw"
+PROCESSED = BASE / "data/processed"
+EMBED = BASE / "data/embeddings"
+PROFILES = BASE / "data/profiles"
+
+# Make src and config importable once for every test module
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
@@ -0,0 +1,36 @@
+import os
+import cProfile
+from typing import Callable
+
+from _paths import PROFILES
+
+def run_test(test_fn: Callable):
+    """Run a test entrypoint, profiling it into data/profiles when PROFILE is set"""
+    if not os.environ.get('PROFILE'):
+        return test_fn()
+    
+    PROFILES.mkdir(parents=True, exist_ok=True)
+    
+    # Optional dependency: pyinstrument flame graph, with cProfile stats as fallback
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+    
+    if Profiler is None:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(test_fn)
+        output_path = PROFILES / f"{test_fn.__name__}.prof"
+        profiler.dump_stats(output_path)
+    else:
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+        try:
+            result = test_fn()
+        finally:
+            profiler.stop()
+        output_path = PROFILES / f"{test_fn.__name__}.html"
+        profiler.write_html(output_path)
+    
+    print(f"⏱️ Profile saved to: {output_path}")
+    return result
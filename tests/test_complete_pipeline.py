@@ -1,6 +1,4 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _paths import RAW, EMBED
 
 from src.data_processing.data_loader import DataLoader
 from src.data_processing.text_processor import TextProcessor
@@ -13,20 +11,18 @@ def test_complete_pipeline():
     print("🚀 Testing Complete Data Processing Pipeline")
     print("="*70)
     
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
     # Step 1: Load Amazon data
     print("\n📊 Step 1: Loading Amazon Dataset")
     print("-" * 40)
     
     loader = DataLoader()
-    amazon_path = os.path.join(base_path, "data/raw/amazon.csv")
+    amazon_path = RAW / "amazon.csv"
     
-    if not os.path.exists(amazon_path):
+    if not amazon_path.exists():
         print("❌ Amazon dataset not found!")
         return None
     
-    df = loader.load_amazon_dataset(amazon_path)
+    df = loader.load_amazon_dataset(amazon_path, use_cache=False)  # Always exercise normalization
     sample_df = df.head(20)  # Use 20 products for complete test
     print(f"✅ Loaded {len(sample_df)} products for testing")
     
@@ -43,7 +39,7 @@ def test_complete_pipeline():
     print("-" * 40)
     
     embedding_generator = EmbeddingGenerator(
-        persist_directory=os.path.join(base_path, "data/embeddings")
+        persist_directory=str(EMBED)
     )
     collection = embedding_generator.process_chunks_to_embeddings(chunks_df)
     
@@ -80,4 +76,5 @@ def test_complete_pipeline():
     }
 
 if __name__ == "__main__":
-    test_complete_pipeline()
\ No newline at end of file
+    from _profiling import run_test
+    run_test(test_complete_pipeline)  # PROFILE=1 writes a profile to data/profiles
\ No newline at end of file
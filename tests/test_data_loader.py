@@ -1,10 +1,9 @@
-import sys
 import os
-# Add parent directory to path so we can import from src
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _paths import BASE, RAW, PROCESSED
 
 from src.data_processing.data_loader import DataLoader
 import pandas as pd
+import pyarrow.csv as pacsv
 
 def test_data_loading():
     """Test data loading with your Amazon dataset"""
@@ -12,18 +11,15 @@ def test_data_loading():
     # Initialize data loader
     loader = DataLoader()
     
-    # Since we're in tests folder, go up one level to find data
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
     # Check for Amazon dataset in data/raw folder
     possible_paths = [
-        os.path.join(base_path, "data/raw/amazon.csv"),           # Your file
-        # os.path.join(base_path, "data/raw/amazon_products.csv"),
+        RAW / "amazon.csv",           # Your file
+        # RAW / "amazon_products.csv",
     ]
     
     dataset_path = None
     for path in possible_paths:
-        if os.path.exists(path):
+        if path.exists():
             dataset_path = path
             print(f"✅ Found dataset: {path}")
             break
@@ -34,74 +30,74 @@ def test_data_loading():
         for path in possible_paths:
             print(f"   - {path}")
         print(f"📁 Current working directory: {os.getcwd()}")
-        print(f"📁 Base path: {base_path}")
+        print(f"📁 Base path: {BASE}")
         return None
     
-    try:
-        print(f"🚀 Testing data loader with: {dataset_path}")
-        
-        # Load dataset
-        df = loader.load_amazon_dataset(dataset_path)
-        
-        print("\n" + "="*60)
-        print("📊 DATASET SUMMARY")
-        print("="*60)
-        print(f"Total products: {len(df)}")
-        print(f"Columns: {list(df.columns)}")
-        
-        print("\n📋 SAMPLE DATA:")
-        print("-"*60)
-        print(df.head(3))
-        
-        print("\n📈 DATA TYPES:")
-        print("-"*30)
-        print(df.dtypes)
-        
-        print("\n📊 BRAND DISTRIBUTION (Top 10):")
-        print("-"*40)
-        print(df['brand'].value_counts().head(10))
-        
-        print("\n📊 CATEGORY DISTRIBUTION (Top 10):")
-        print("-"*45)
-        print(df['category'].value_counts().head(10))
-        
-        print("\n💰 PRICE STATISTICS:")
-        print("-"*30)
-        print(df['price'].describe())
-        print(f"Currency range: ₹{df['price'].min():.2f} - ₹{df['price'].max():.2f}")
-        
-        print("\n📝 DESCRIPTION SAMPLE:")
-        print("-"*35)
-        sample_desc = df['description'].iloc[0]
-        print(f"First product description (first 200 chars):")
-        print(f"'{sample_desc[:200]}...'")
-        
-        # Validate some products
-        print(f"\n✅ VALIDATION TEST:")
-        print("-"*30)
-        valid_products = loader.validate_products(df.head(100))
-        print(f"Validated {len(valid_products)} out of 100 products successfully")
-        
-        # Create processed directory if it doesn't exist
-        processed_dir = os.path.join(base_path, "data/processed")
-        os.makedirs(processed_dir, exist_ok=True)
-        
-        # Save processed data
-        output_path = os.path.join(processed_dir, "amazon_processed.csv")
-        df.to_csv(output_path, index=False)
-        print(f"\n💾 Processed data saved to: {output_path}")
-        
-        print("\n" + "="*60)
-        print("🎉 DATA LOADING TEST COMPLETED SUCCESSFULLY!")
-        print("="*60)
-        
-        return df
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    print(f"🚀 Testing data loader with: {dataset_path}")
+    
+    # Check the CSV header before parsing the whole file
+    schema = pacsv.open_csv(dataset_path).schema
+    required_columns = {'product_name', 'about_product', 'discounted_price', 'category'}
+    missing_columns = required_columns - set(schema.names)
+    assert not missing_columns, f"Dataset is missing columns: {sorted(missing_columns)}"
+    
+    # Load dataset
+    df = loader.load_amazon_dataset(dataset_path, use_cache=False)  # Always exercise normalization
+    
+    print("\n" + "="*60)
+    print("📊 DATASET SUMMARY")
+    print("="*60)
+    print(f"Total products: {len(df)}")
+    print(f"Columns: {list(df.columns)}")
+    
+    print("\n📋 SAMPLE DATA:")
+    print("-"*60)
+    print(df.head(3))
+    
+    print("\n📈 DATA TYPES:")
+    print("-"*30)
+    print(df.dtypes)
+    
+    print("\n📊 BRAND DISTRIBUTION (Top 10):")
+    print("-"*40)
+    print(df['brand'].value_counts().head(10))
+    
+    print("\n📊 CATEGORY DISTRIBUTION (Top 10):")
+    print("-"*45)
+    print(df['category'].value_counts().head(10))
+    
+    print("\n💰 PRICE STATISTICS:")
+    print("-"*30)
+    price_stats = df.agg({'price': ['count', 'mean', 'std', 'min', 'max']})['price']
+    print(price_stats)
+    print(f"Currency range: ₹{price_stats['min']:.2f} - ₹{price_stats['max']:.2f}")
+    
+    print("\n📝 DESCRIPTION SAMPLE:")
+    print("-"*35)
+    sample_desc = df['description'].iloc[0]
+    print(f"First product description (first 200 chars):")
+    print(f"'{sample_desc[:200]}...'")
+    
+    # Validate some products
+    print(f"\n✅ VALIDATION TEST:")
+    print("-"*30)
+    valid_products = loader.validate_products(df.head(100), as_models=False)
+    print(f"Validated {len(valid_products)} out of 100 products successfully")
+    
+    # Create processed directory if it doesn't exist
+    PROCESSED.mkdir(parents=True, exist_ok=True)
+    
+    # Save processed data
+    output_path = PROCESSED / "amazon_processed.parquet"
+    df.to_parquet(output_path, engine='pyarrow', compression='zstd', row_group_size=65536, index=False)
+    print(f"\n💾 Processed data saved to: {output_path}")
+    
+    print("\n" + "="*60)
+    print("🎉 DATA LOADING TEST COMPLETED SUCCESSFULLY!")
+    print("="*60)
+    
+    return df
 
 if __name__ == "__main__":
-    test_data_loading()
\ No newline at end of file
+    from _profiling import run_test
+    run_test(test_data_loading)  # PROFILE=1 writes a profile to data/profiles
\ No newline at end of file
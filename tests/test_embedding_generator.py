@@ -1,9 +1,8 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _paths import PROCESSED, EMBED
 
 from src.data_processing.embedding_generator import EmbeddingGenerator
 import pandas as pd
+import pyarrow.parquet as pq
 
 def test_embedding_generation():
     """Test embedding generation and ChromaDB storage"""
@@ -12,28 +11,35 @@ def test_embedding_generation():
     print("="*60)
     
     # Load chunks data
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    chunks_path = os.path.join(base_path, "data/processed/product_chunks.csv")
+    chunks_path = PROCESSED / "product_chunks.parquet"
     
-    if not os.path.exists(chunks_path):
+    if not chunks_path.exists():
         print("❌ No chunks data found. Run test_text_processor.py first!")
         return None
     
     print(f"📂 Loading chunks from: {chunks_path}")
-    chunks_df = pd.read_csv(chunks_path)
-    
-    # Use subset for testing (first 50 chunks)
-    test_chunks = chunks_df.head(50).copy()
+    # Use subset for testing (only the first 50 chunks are read)
+    test_chunks = next(pq.ParquetFile(chunks_path).iter_batches(batch_size=50)).to_pandas()
     print(f"📊 Testing with {len(test_chunks)} chunks")
     
     # Initialize embedding generator
     embedding_generator = EmbeddingGenerator(
         model_name="sentence-transformers/all-MiniLM-L6-v2",
-        persist_directory=os.path.join(base_path, "data/embeddings")
+        persist_directory=str(EMBED),
+        fp16=True,
+        vector_store="faiss"  # Exact flat search; ≤50 vectors need no HNSW or persistence
     )
     
     # Process chunks to embeddings
-    collection = embedding_generator.process_chunks_to_embeddings(test_chunks)
+    collection = embedding_generator.process_chunks_to_embeddings(
+        test_chunks,
+        block_size=len(test_chunks),  # One encode and one bulk collection.add
+        batch_size=64,
+        cache_embeddings=True,  # Later runs memory-map the FP16 vectors instead of encoding
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
     
     # Test similarity searches
     test_queries = [
@@ -47,9 +53,8 @@ def test_embedding_generation():
     print(f"\n🔍 Testing similarity search with sample queries:")
     print("="*60)
     
-    for query in test_queries:
-        embedding_generator.test_similarity_search(collection, query, n_results=3)
-        print()
+    embedding_generator.batch_similarity_search(collection, test_queries, n_results=3)
+    print()
     
     # Collection stats
     print(f"📊 ChromaDB Collection Statistics:")
@@ -61,4 +66,5 @@ def test_embedding_generation():
     return collection
 
 if __name__ == "__main__":
-    test_embedding_generation()
\ No newline at end of file
+    from _profiling import run_test
+    run_test(test_embedding_generation)  # PROFILE=1 writes a profile to data/profiles
\ No newline at end of file
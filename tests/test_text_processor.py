@@ -1,6 +1,4 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _paths import PROCESSED
 
 from src.data_processing.text_processor import TextProcessor
 from src.data_processing.data_loader import DataLoader
@@ -13,21 +11,24 @@ def test_text_processing():
     print("="*50)
     
     # Initialize components
-    text_processor = TextProcessor(target_chunk_size=125, overlap_size=25)
+    text_processor = TextProcessor(target_chunk_size=125, overlap_size=25, n_jobs=-1)  # All cores for large frames
     
     # Load processed data
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    processed_path = os.path.join(base_path, "data/processed/amazon_processed.csv")
+    processed_path = PROCESSED / "amazon_processed.parquet"
     
-    if not os.path.exists(processed_path):
+    if not processed_path.exists():
         print("❌ No processed data found. Run test_data_loader.py first!")
         return None
     
     print(f"📂 Loading processed data from: {processed_path}")
-    df = pd.read_csv(processed_path)
+    df = pd.read_parquet(
+        processed_path,
+        engine='pyarrow',
+        columns=['product_id', 'title', 'description', 'brand', 'category', 'price', 'availability']
+    )
     
     # Test with first 10 products for demo
-    sample_df = df.head(10).copy()
+    sample_df = df.head(10)  # Read-only view, no copy needed
     
     print(f"📊 Processing {len(sample_df)} products...")
     
@@ -36,27 +37,30 @@ def test_text_processing():
     
     print(f"\n📋 Sample concatenated text:")
     print("-" * 40)
-    sample_product = sample_df.iloc[0].to_dict()
+    sample_product = next(sample_df.itertuples(index=False))._asdict()
+    first_pid = sample_product['product_id']
     concatenated = text_processor.concatenate_product_text(sample_product)
     print(f"Original title: {sample_product['title'][:50]}...")
     print(f"Concatenated text: {concatenated[:200]}...")
     
     print(f"\n📄 Sample chunks:")
     print("-" * 30)
-    sample_chunks = chunks_df[chunks_df['product_id'] == sample_df.iloc[0]['product_id']]
+    chunk_groups = chunks_df.groupby('product_id', sort=False).indices  # product_id -> row positions
+    sample_chunks = chunks_df.iloc[chunk_groups[first_pid]]
     
-    for idx, chunk in sample_chunks.iterrows():
-        print(f"Chunk {chunk['chunk_index']}: {chunk['word_count']} words")
-        print(f"Text: {chunk['text'][:100]}...")
+    for chunk in sample_chunks.itertuples(index=False):
+        print(f"Chunk {chunk.chunk_index}: {chunk.word_count} words")
+        print(f"Text: {chunk.text[:100]}...")
         print()
     
     # Save chunks
-    chunks_output_path = os.path.join(base_path, "data/processed/product_chunks.csv")
-    chunks_df.to_csv(chunks_output_path, index=False)
+    chunks_output_path = PROCESSED / "product_chunks.parquet"
+    chunks_df.to_parquet(chunks_output_path, engine='pyarrow', compression='zstd', row_group_size=65536, index=False)
     print(f"💾 Chunks saved to: {chunks_output_path}")
     
     print("\n🎉 Text processing test completed!")
     return chunks_df
 
 if __name__ == "__main__":
-    test_text_processing()
\ No newline at end of file
+    from _profiling import run_test
+    run_test(test_text_processing)  # PROFILE=1 writes a profile to data/profiles
\ No newline at end of file